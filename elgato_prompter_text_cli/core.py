@@ -11,20 +11,22 @@ Set the ELGATO_PROMPTER_DIR environment variable
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import os
 import re
 import sys
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple, Dict, Any
+from typing import Callable, Iterator, List, Optional, Tuple, Dict, Any
 
+try:
+    import orjson  # optional: much faster JSON parse/serialize
+except ImportError:
+    orjson = None
 
-from pydantic_ai import Agent
-
-
-from .restarter import AppRestarter
+# pydantic_ai, pandas and the restarter are imported where they're used so `ls` starts fast
 
 
 DEFAULT_DIR = Path.cwd()  # override with --dir or $ELGATO_PROMPTER_DIR
@@ -32,45 +34,102 @@ ENV_DIR = os.environ.get("ELGATO_PROMPTER_DIR")
 
 SETTINGS_KEY = "applogic.prompter.libraryList"
 
+# Below this many files a thread pool costs more than it saves
+_PARALLEL_LOAD_MIN = 16
+
+_REQUIRED_KEYS = frozenset(("GUID", "chapters", "friendlyName", "index"))
+
+# ls columns holding ints; everything else sorts as case-insensitive text
+_NUMERIC_COLUMNS = frozenset(("index", "chaptersCount"))
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+# Parsed prompt files keyed by path; (mtime_ns, size) tells us when to re-read.
+_PROMPT_CACHE: Dict[Path, Tuple[int, int, dict]] = {}
+
+
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(data: Any) -> bytes:
+    # orjson only supports 2-space indent; use the same for the stdlib fallback so output doesn't depend on it
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
 
 def slugify(value: str, max_len: int = 48) -> str:
     value = value.strip().lower()
-    value = re.sub(r"[^a-z0-9]+", "-", value)
+    value = _SLUG_RE.sub("-", value)
     value = value.strip("-")
     if len(value) > max_len:
         value = value[:max_len].rstrip("-")
     return value or "prompt"
 
 
-def read_lines(path: Path) -> List[str]:
+def read_lines(path: Path) -> Iterator[str]:
+    # Lazy: the file stays open until the caller has consumed every line
     with path.open("r", encoding="utf-8") as f:
-        return [line.rstrip("\n") for line in f if line.strip()]
+        for line in f:
+            if line.strip():
+                yield line.rstrip("\n")
+
 
+def iter_prompt_files(dir_path: Path) -> List[Path]:
+    # os.scandir reads the file type from the directory entry; only symlinks need a stat().
+    # Skipping dotfiles is a deliberate change from the earlier Path.glob("*.json"), which
+    # matched them: macOS leaves "._<name>.json" AppleDouble files next to prompts on
+    # exFAT/SMB volumes, and they aren't prompts.
+    with os.scandir(dir_path) as it:
+        names = [e.name for e in it
+                 if e.name.endswith(".json") and not e.name.startswith(".") and e.is_file()]
+    names.sort()
+    return [dir_path / n for n in names]
 
-def iter_prompt_files(dir_path: Path) -> Iterable[Path]:
-    yield from sorted(dir_path.glob("*.json"))
+
+def clear_cache() -> None:
+    _PROMPT_CACHE.clear()
+
+
+def _cache_put(path: Path, st: os.stat_result, data: dict) -> None:
+    _PROMPT_CACHE[path] = (st.st_mtime_ns, st.st_size, data)
 
 
 def load_prompt(path: Path) -> Optional[dict]:
     try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            return None
-        required = {"GUID", "chapters", "friendlyName", "index"}
-        if not required.issubset(data):
+        cached = _PROMPT_CACHE.get(path)
+        if cached:
+            st = path.stat()
+            if cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                return cached[2]
+        with path.open("rb") as f:
+            # Validation key from the open handle: a cold load costs no extra stat() call
+            st = os.fstat(f.fileno())
+            data = _json_loads(f.read())
+        if not isinstance(data, dict) or not _REQUIRED_KEYS <= data.keys():
             return None
+        _cache_put(path, st, data)
         return data
     except Exception:
         return None
 
 
+def scan_library(dir_path: Path) -> List[Tuple[Path, dict]]:
+    paths = iter_prompt_files(dir_path)
+    if len(paths) > _PARALLEL_LOAD_MIN:
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ex:
+            datas = list(ex.map(load_prompt, paths))
+    else:
+        datas = [load_prompt(p) for p in paths]
+    return [(p, data) for p, data in zip(paths, datas) if data]
+
+
 def next_index(dir_path: Path) -> int:
     max_idx = 0
-    for p in iter_prompt_files(dir_path):
-        data = load_prompt(p)
-        if not data:
-            continue
+    for _, data in scan_library(dir_path):
         try:
             i = int(data.get("index", 0))
             if i > max_idx:
@@ -84,6 +143,7 @@ def ensure_dir(dir_path: Path) -> None:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 
+@functools.lru_cache(maxsize=8)
 def choose_dir(cli_dir: Optional[str]) -> Path:
     if cli_dir:
         return Path(cli_dir).expanduser().resolve()
@@ -93,11 +153,17 @@ def choose_dir(cli_dir: Optional[str]) -> Path:
 
 
 def generate_guid() -> str:
-    return str(uuid.uuid4()).upper()
+    # RFC 4122 version 4 UUID, formatted uppercase straight from the random bytes
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40
+    b[8] = (b[8] & 0x3F) | 0x80
+    h = b.hex().upper()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
 
 
 # ---------- AppSettings helpers (one directory up from Texts dir) ----------
 
+@functools.lru_cache(maxsize=8)
 def get_appsettings_path(texts_dir: Path) -> Path:
     # AppSettings.json lives at parent of the Texts directory
     return (texts_dir.parent / "AppSettings.json").resolve()
@@ -106,19 +172,22 @@ def get_appsettings_path(texts_dir: Path) -> Path:
 def load_settings(settings_path: Path) -> Dict[str, Any]:
     if not settings_path.exists():
         return {}
-    with settings_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    with settings_path.open("rb") as f:
+        data = _json_loads(f.read())
         if isinstance(data, dict):
             return data
         return {}
 
+def _write_atomic(path: Path, payload: bytes) -> None:
+    # One write() of the serialized bytes, then rename over the target
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(payload)
+    tmp.replace(path)
+
+
 def save_settings(settings_path: Path, data: Dict[str, Any]) -> None:
     settings_path.parent.mkdir(parents=True, exist_ok=True)
-    tmp = settings_path.with_suffix(".json.tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-        f.write("\n")
-    tmp.replace(settings_path)
+    _write_atomic(settings_path, _json_dumps(data))
 
 
 def settings_add_guid(texts_dir: Path, guid: str) -> Path:
@@ -128,6 +197,7 @@ def settings_add_guid(texts_dir: Path, guid: str) -> Path:
     if not isinstance(lst, list):
         lst = []
     guid_up = guid.upper()
+    # Append only: the list's order and any duplicates belong to Camera Hub
     if guid_up not in lst:
         lst.append(guid_up)
     settings[SETTINGS_KEY] = lst
@@ -188,28 +258,50 @@ def write_prompt_file(dir_path: Path, data: dict) -> Path:
     guid = str(data["GUID"]).upper()
     filename = f"{guid}.json"
     out_path = dir_path / filename
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-        f.write("\n")
+    _write_atomic(out_path, _json_dumps(data))
+    st = out_path.stat()
+    _cache_put(out_path, st, data)
     return out_path
 
 
+def _find_direct(dir_path: Path, guid: Optional[str], filename: Optional[str]) -> Optional[List[Tuple[Path, dict]]]:
+    # Prompt files are named {GUID}.json, so a GUID or filename normally points straight at the file.
+    # Returns None when a GUID isn't found under its own name and only a full scan can settle it.
+    guid_norm = guid.upper() if guid else None
+    matches: List[Tuple[Path, dict]] = []
+    seen = set()
+    for name in (filename, f"{guid_norm}.json" if guid_norm else None):
+        if not name or name in seen or os.path.basename(name) != name:
+            continue
+        if name.startswith(".") or not name.endswith(".json"):
+            continue
+        seen.add(name)
+        p = dir_path / name
+        data = load_prompt(p)
+        if data and (name == filename or str(data.get("GUID", "")).upper() == guid_norm):
+            matches.append((p, data))
+    if guid_norm and not any(str(d.get("GUID", "")).upper() == guid_norm for _, d in matches):
+        return None
+    return matches
+
+
 def find_matches(dir_path: Path, guid: Optional[str], friendly_name: Optional[str], filename: Optional[str]) -> List[Tuple[Path, dict]]:
+    if not friendly_name:
+        direct = _find_direct(dir_path, guid, filename)
+        if direct is not None:
+            return direct
     matches = []
     guid_norm = guid.upper() if guid else None
     filename_norm = filename if filename else None
-    name_norm = friendly_name.strip().lower() if friendly_name else None
+    name_norm = friendly_name.strip().casefold() if friendly_name else None
 
-    for p in iter_prompt_files(dir_path):
-        data = load_prompt(p)
-        if not data:
-            continue
+    for p, data in scan_library(dir_path):
         ok = False
         if guid_norm and str(data.get("GUID", "")).upper() == guid_norm:
             ok = True
         if filename_norm and p.name == filename_norm:
             ok = True
-        if name_norm and str(data.get("friendlyName", "")).strip().lower() == name_norm:
+        if name_norm and str(data.get("friendlyName", "")).strip().casefold() == name_norm:
             ok = True
         if ok:
             matches.append((p, data))
@@ -237,7 +329,7 @@ def cmd_add(a: AddArgs) -> int:
     }
 
     if a.dry_run:
-        print(json.dumps(data, indent=4, ensure_ascii=False))
+        print(_json_dumps(data).decode("utf-8"), end="")
         return 0
 
     out_path = write_prompt_file(a.dir, data)
@@ -273,6 +365,7 @@ def cmd_del(a: DelArgs) -> int:
     for p, d in matches:
         try:
             p.unlink()
+            _PROMPT_CACHE.pop(p, None)
             g = str(d.get("GUID", "")).upper()
             print(f"Deleted: {p.name}  (GUID={g}, index={d.get('index')}, name={d.get('friendlyName')})")
             deleted += 1
@@ -289,37 +382,31 @@ def cmd_del(a: DelArgs) -> int:
     return 0 if deleted else 1
 
 
-def _collect_rows(dir_path: Path, include_chapters: bool) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    for p in iter_prompt_files(dir_path):
-        data = load_prompt(p)
-        if not data:
-            continue
-        row: Dict[str, Any] = {
-            "file": p.name,
-            "index": int(data.get("index", 0)),
-            "friendlyName": data.get("friendlyName", ""),
-            "GUID": str(data.get("GUID", "")).upper(),
-            "chaptersCount": len(data.get("chapters", [])),
-        }
+def _collect_columns(dir_path: Path, include_chapters: bool) -> Dict[str, List[Any]]:
+    # Column-oriented so pandas can build the DataFrame straight from the lists
+    table: Dict[str, List[Any]] = {"file": [], "index": [], "friendlyName": [], "GUID": [], "chaptersCount": []}
+    if include_chapters:
+        table["chapters"] = []
+    for p, data in scan_library(dir_path):
+        chapters = data.get("chapters", [])
+        table["file"].append(p.name)
+        table["index"].append(int(data.get("index", 0)))
+        table["friendlyName"].append(data.get("friendlyName", ""))
+        table["GUID"].append(str(data.get("GUID", "")).upper())
+        table["chaptersCount"].append(len(chapters))
         if include_chapters:
-            row["chapters"] = " | ".join(map(str, data.get("chapters", [])))
-        rows.append(row)
-    return rows
+            table["chapters"].append(" | ".join(map(str, chapters)))
+    return table
 
 
-def _print_table_pandas(rows: List[Dict[str, Any]], columns: List[str], sort: str, reverse: bool, limit: Optional[int]) -> int:
-    try:
-        import pandas as pd  # type: ignore
-    except Exception:
-        print("pandas is not installed. Install with `pip install pandas` or omit --pandas.", file=sys.stderr)
-        return 2
+def _print_table_pandas(table: Dict[str, List[Any]], columns: List[str], sort: str, reverse: bool, limit: Optional[int]) -> int:
+    import pandas as pd  # type: ignore  # ImportError is handled by cmd_ls
 
-    if not rows:
+    if not table["file"]:
         print("No prompts found.")
         return 0
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(table)
     if columns:
         missing = [c for c in columns if c not in df.columns]
         if missing:
@@ -344,56 +431,77 @@ def _print_table_pandas(rows: List[Dict[str, Any]], columns: List[str], sort: st
     return 0
 
 
-def _print_table_plain(rows: List[Dict[str, Any]], columns: List[str], sort: str, reverse: bool, limit: Optional[int]) -> int:
-    if not rows:
+def _sort_key(table: Dict[str, List[Any]], sort: str) -> Callable[[int], Any]:
+    values = table.get(sort)
+    if values is None:
+        return lambda i: 0
+    if sort in _NUMERIC_COLUMNS:
+        return values.__getitem__
+    return lambda i: str(values[i] or "").lower()
+
+
+def _print_table_plain(table: Dict[str, List[Any]], columns: List[str], sort: str, reverse: bool, limit: Optional[int]) -> int:
+    if not table["file"]:
         print("No prompts found.")
         return 0
 
     cols = columns if columns else ["index", "friendlyName", "GUID", "chaptersCount", "file"]
-    if any("chapters" in r for r in rows) and "chapters" not in cols:
+    if "chapters" in table and "chapters" not in cols:
         cols.append("chapters")
 
+    order = list(range(len(table["file"])))
     if sort:
         try:
-            rows.sort(key=lambda r: r.get(sort, ""), reverse=reverse)
+            order.sort(key=_sort_key(table, sort), reverse=reverse)
         except Exception:
             print(f"Unable to sort by {sort}", file=sys.stderr)
 
     if limit is not None:
-        rows = rows[:limit]
-
-    def cell(v: Any) -> str:
-        return "" if v is None else str(v)
-
-    widths = {c: max(len(c), *(len(cell(r.get(c))) for r in rows)) for c in cols}
-    header = "  ".join(c.ljust(widths[c]) for c in cols)
-    sep = "  ".join("-" * widths[c] for c in cols)
-    print(header)
-    print(sep)
-    for r in rows:
-        print("  ".join(cell(r.get(c)).ljust(widths[c]) for c in cols))
+        order = order[:limit]
+
+    # Stringify each column once; its width falls out of the same list
+    texts: List[List[str]] = []
+    widths: List[int] = []
+    for c in cols:
+        values = table.get(c)
+        if values is None:
+            col_texts = [""] * len(order)
+        else:
+            col_texts = [v if isinstance(v, str) else ("" if v is None else str(v)) for v in map(values.__getitem__, order)]
+        texts.append(col_texts)
+        widths.append(max([len(c), *map(len, col_texts)]))
+
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    print("  ".join("-" * w for w in widths))
+    for line in zip(*texts):
+        print("  ".join(text.ljust(w) for text, w in zip(line, widths)))
     return 0
 
 
 def cmd_ls(a: LsArgs) -> int:
     ensure_dir(a.dir)
-    rows = _collect_rows(a.dir, include_chapters=a.show_chapters)
-    if a.pandas:
-        return _print_table_pandas(rows, a.columns, a.sort, a.reverse, a.limit)
+    table = _collect_columns(a.dir, include_chapters=a.show_chapters)
     try:
-        import pandas as _pd  # noqa: F401
-        return _print_table_pandas(rows, a.columns, a.sort, a.reverse, a.limit)
-    except Exception:
-        return _print_table_plain(rows, a.columns, a.sort, a.reverse, a.limit)
+        return _print_table_pandas(table, a.columns, a.sort, a.reverse, a.limit)
+    except ImportError:
+        if a.pandas:
+            print("pandas is not installed. Install with `pip install pandas` or omit --pandas.", file=sys.stderr)
+            return 2
+        return _print_table_plain(table, a.columns, a.sort, a.reverse, a.limit)
 
 
 
-# Define the agent with your chosen model
-agent = Agent("openai:gpt-4o-mini")
+# The agent is created on first use; building it imports pydantic_ai and sets up the model client
+_agent = None
 
 # Define a function that uses the agent to generate the script
 def gen_prompter_script(topic: str) -> str:
-    result = agent.run_sync(
+    global _agent
+    if _agent is None:
+        from pydantic_ai import Agent
+        # Define the agent with your chosen model
+        _agent = Agent("openai:gpt-4o-mini")
+    result = _agent.run_sync(
         f"""Write a short script with some decent talking points for the following topic: {topic}
 
          ## NOTE
@@ -447,21 +555,26 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 
+def _iter_chapter_sources(ns: argparse.Namespace) -> Iterator[str]:
+    yield from ns.chapter or []
+    if ns.chapters_file:
+        yield from read_lines(Path(ns.chapters_file))
+    if ns.from_stdin:
+        for line in sys.stdin:
+            if line.strip():
+                yield line.rstrip("\n")
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     parser = build_parser()
     ns = parser.parse_args(argv)
     dir_path = choose_dir(ns.dir)
 
     if ns.cmd == "add":
+        from .restarter import AppRestarter
 
         with AppRestarter("Camera Hub"):
-            chapters: List[str] = []
-            chapters.extend(ns.chapter or [])
-            if ns.chapters_file:
-                chapters.extend(read_lines(Path(ns.chapters_file)))
-            if ns.from_stdin:
-                stdin_lines = [line.rstrip("\n") for line in sys.stdin if line.strip()]
-                chapters.extend(stdin_lines)
+            chapters = list(_iter_chapter_sources(ns))
 
             args = AddArgs(
                 friendly_name=ns.name,
@@ -474,6 +587,8 @@ def main(argv: Optional[List[str]] = None) -> int:
             return cmd_add(args)
 
     elif ns.cmd == "del":
+        from .restarter import AppRestarter
+
         with AppRestarter("Camera Hub"):
             args = DelArgs(
                 guid=ns.guid,
@@ -497,6 +612,8 @@ def main(argv: Optional[List[str]] = None) -> int:
         return cmd_ls(args)
 
     elif ns.cmd == "gen":
+        from .restarter import AppRestarter
+
         with AppRestarter("Camera Hub"):
             # Generate prompt script using LLM
             script = gen_prompter_script(str(ns.topic))
@@ -507,7 +624,7 @@ def main(argv: Optional[List[str]] = None) -> int:
                 chapters=chapters,
                 index=None,
                 guid=None,
-                dir=choose_dir(ns.dir),
+                dir=dir_path,
                 dry_run=False
             )
             return cmd_add(args)
@@ -9,9 +9,20 @@ Usage:
   python3 restart_app.py chrome
 """
 
-import os, sys, time, subprocess
+import os, re, sys, time, subprocess
+import base64
+import contextlib
+import ctypes
+import fnmatch
+import json
+import plistlib
+import select
+import shutil
+import functools
+import threading
+import uuid
 from pathlib import Path
-from typing import Optional, List
+from typing import NamedTuple, Optional, List, Tuple, Union
 
 # -------------------------
 # Shared helpers
@@ -27,8 +38,83 @@ def is_macos() -> bool:
 def is_windows() -> bool:
     return sys.platform.startswith("win")
 
+def wait_pids_exit(pids: List[int], timeout_s: float) -> Optional[List[int]]:
+    """
+    Block until every pid has exited or timeout_s passes, waking on exit events instead of polling.
+    Returns the pids still alive, or None when we can't wait on them (caller falls back to polling).
+    """
+    if hasattr(select, "kqueue"):
+        return _kqueue_wait_pids(pids, timeout_s)
+    if is_windows():
+        return _win_wait_pids(pids, timeout_s)
+    return None
+
+def _kqueue_wait_pids(pids: List[int], timeout_s: float) -> Optional[List[int]]:
+    kq = select.kqueue()
+    try:
+        live = set()
+        for pid in pids:
+            ev = select.kevent(pid, filter=select.KQ_FILTER_PROC,
+                               flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT, fflags=select.KQ_NOTE_EXIT)
+            try:
+                kq.control([ev], 0, 0)
+            except ProcessLookupError:
+                continue  # already gone
+            except PermissionError:
+                return None
+            live.add(pid)
+        deadline = time.monotonic() + timeout_s
+        while live:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for ev in kq.control(None, len(live), remaining):
+                live.discard(ev.ident)
+        return sorted(live)
+    finally:
+        kq.close()
+
+_SYNCHRONIZE = 0x00100000
+_ERROR_ACCESS_DENIED = 5
+_WAIT_TIMEOUT = 0x102
+_MAXIMUM_WAIT_OBJECTS = 64
+
+def _win_wait_pids(pids: List[int], timeout_s: float) -> Optional[List[int]]:
+    from ctypes import wintypes
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.OpenProcess.restype = wintypes.HANDLE
+    k32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    k32.WaitForMultipleObjects.restype = wintypes.DWORD
+    k32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD]
+    k32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    live = {}
+    try:
+        for pid in pids:
+            h = k32.OpenProcess(_SYNCHRONIZE, False, pid)
+            if h:
+                live[pid] = h
+            elif ctypes.get_last_error() == _ERROR_ACCESS_DENIED:
+                return None
+            # any other failure means the pid no longer exists
+        deadline = time.monotonic() + timeout_s
+        while live:
+            remaining_ms = int(max(0.0, deadline - time.monotonic()) * 1000)
+            batch = list(live.items())[:_MAXIMUM_WAIT_OBJECTS]
+            arr = (wintypes.HANDLE * len(batch))(*(h for _, h in batch))
+            rc = k32.WaitForMultipleObjects(len(batch), arr, False, remaining_ms)
+            if rc >= len(batch):  # WAIT_TIMEOUT, WAIT_FAILED or abandoned
+                break
+            pid, h = batch[rc]
+            k32.CloseHandle(h)
+            del live[pid]
+        return sorted(live)
+    finally:
+        for h in live.values():
+            k32.CloseHandle(h)
+
 # -------------------------
-# macOS implementation (unchanged from your version)
+# macOS implementation
 # -------------------------
 
 SPOTLIGHT_QUERY_TEMPLATE = (
@@ -36,27 +122,173 @@ SPOTLIGHT_QUERY_TEMPLATE = (
     '(kMDItemDisplayName == "*{q}*" || kMDItemCFBundleIdentifier == "*{q}*")'
 )
 
+# Where Spotlight lookups (MDQuery and the mdfind fallback) look for applications.
+# Results aren't capped: Spotlight returns them unordered and mac_mdfind_app ranks them.
+MDFIND_APP_DIRS = ("~/Applications", "/System/Applications", "/Applications")
+
+_CF_STRING_ENCODING_UTF8 = 0x08000100
+_MDQUERY_SYNCHRONOUS = 1
+
+@functools.lru_cache(maxsize=1)
+def _mac_frameworks():
+    """Load CoreServices/CoreFoundation and declare the MDQuery/LaunchServices signatures; None if unavailable."""
+    try:
+        cs = ctypes.CDLL("/System/Library/Frameworks/CoreServices.framework/CoreServices")
+        cf = ctypes.CDLL("/System/Library/Frameworks/CoreFoundation.framework/CoreFoundation")
+        vp, idx = ctypes.c_void_p, ctypes.c_long
+        cf.CFStringCreateWithCString.restype = vp
+        cf.CFStringCreateWithCString.argtypes = [vp, ctypes.c_char_p, ctypes.c_uint32]
+        cf.CFStringGetCString.restype = ctypes.c_bool
+        cf.CFStringGetCString.argtypes = [vp, ctypes.c_char_p, idx, ctypes.c_uint32]
+        cf.CFRelease.restype = None
+        cf.CFRelease.argtypes = [vp]
+        cs.MDQueryCreate.restype = vp
+        cs.MDQueryCreate.argtypes = [vp, vp, vp, vp]
+        cf.CFArrayCreate.restype = vp
+        cf.CFArrayCreate.argtypes = [vp, ctypes.POINTER(vp), idx, vp]
+        cs.MDQuerySetSearchScope.restype = None
+        cs.MDQuerySetSearchScope.argtypes = [vp, vp, ctypes.c_uint32]
+        cs.MDQueryExecute.restype = ctypes.c_bool
+        cs.MDQueryExecute.argtypes = [vp, ctypes.c_ulong]
+        cs.MDQueryGetResultCount.restype = idx
+        cs.MDQueryGetResultCount.argtypes = [vp]
+        cs.MDQueryGetResultAtIndex.restype = vp
+        cs.MDQueryGetResultAtIndex.argtypes = [vp, idx]
+        cs.MDItemCopyAttribute.restype = vp
+        cs.MDItemCopyAttribute.argtypes = [vp, vp]
+        cf.CFURLCreateFromFileSystemRepresentation.restype = vp
+        cf.CFURLCreateFromFileSystemRepresentation.argtypes = [vp, ctypes.c_char_p, idx, ctypes.c_bool]
+        cs.LSOpenCFURLRef.restype = ctypes.c_int32
+        cs.LSOpenCFURLRef.argtypes = [vp, vp]
+        k_path = vp.in_dll(cs, "kMDItemPath").value
+        array_callbacks = ctypes.addressof(vp.in_dll(cf, "kCFTypeArrayCallBacks"))
+    except (OSError, AttributeError, ValueError):
+        return None
+    return cs, cf, k_path, array_callbacks
+
+def _mac_cf_path_array(cf, array_callbacks: int, dirs: Tuple[str, ...]) -> Optional[int]:
+    """CFArray of CFString paths (caller releases it); None on failure."""
+    strs = [cf.CFStringCreateWithCString(None, os.path.expanduser(d).encode("utf-8"), _CF_STRING_ENCODING_UTF8)
+            for d in dirs]
+    try:
+        if not all(strs):
+            return None
+        values = (ctypes.c_void_p * len(strs))(*strs)
+        return cf.CFArrayCreate(None, values, len(strs), array_callbacks) or None
+    finally:
+        for ref in strs:
+            if ref:
+                cf.CFRelease(ref)
+
+def mac_mdquery_paths(query: str, scope: Tuple[str, ...] = MDFIND_APP_DIRS) -> Optional[List[str]]:
+    """Run a Spotlight query in-process via MDQuery, limited to `scope`; None means fall back to `mdfind`."""
+    libs = _mac_frameworks()
+    if libs is None:
+        return None
+    cs, cf, k_path, array_callbacks = libs
+    qstr = cf.CFStringCreateWithCString(None, query.encode("utf-8"), _CF_STRING_ENCODING_UTF8)
+    if not qstr:
+        return None
+    q = cs.MDQueryCreate(None, qstr, None, None)
+    cf.CFRelease(qstr)
+    if not q:
+        return None
+    try:
+        scope_ref = _mac_cf_path_array(cf, array_callbacks, scope)
+        if scope_ref is None:
+            return None
+        cs.MDQuerySetSearchScope(q, scope_ref, 0)
+        cf.CFRelease(scope_ref)
+        if not cs.MDQueryExecute(q, _MDQUERY_SYNCHRONOUS):
+            return None
+        paths: List[str] = []
+        buf = ctypes.create_string_buffer(4096)
+        for i in range(cs.MDQueryGetResultCount(q)):
+            item = cs.MDQueryGetResultAtIndex(q, i)
+            if not item:
+                continue
+            val = cs.MDItemCopyAttribute(item, k_path)
+            if not val:
+                continue
+            try:
+                if cf.CFStringGetCString(val, buf, len(buf), _CF_STRING_ENCODING_UTF8):
+                    paths.append(buf.value.decode("utf-8"))
+            finally:
+                cf.CFRelease(val)
+        return paths
+    finally:
+        cf.CFRelease(q)
+
 def mac_mdfind_app(search: str) -> Optional[Path]:
     query = SPOTLIGHT_QUERY_TEMPLATE.format(q=search)
-    out = run(["mdfind", query], check=False)
-    hits = [Path(p) for p in out.splitlines() if p.endswith(".app")]
-    if not hits:
+    found = mac_mdquery_paths(query)
+    if found is None:
+        onlyin = []
+        for root in MDFIND_APP_DIRS:
+            onlyin += ["-onlyin", os.path.expanduser(root)]
+        found = run(["mdfind", *onlyin, query], check=False).splitlines()
+    # The query only matches kMDItemKind == "Application", so every hit is an app bundle
+    paths = [p for p in found if p]
+    if not paths:
         return None
     s = search.lower()
-    def score(p: Path):
-        path_str = str(p)
-        name = p.stem.lower()
+    # Derive each hit's scoring inputs once, in parallel lists, instead of inside the key
+    names = [Path(p).stem.lower() for p in paths]
+    in_apps = [p.startswith(("/Applications/", "/System/Applications/")) for p in paths]
+    def score(i: int):
         return (
-            2 if (path_str.startswith("/Applications/") or path_str.startswith("/System/Applications/")) else 0,
-            2 if name.startswith(s) else 0,
-            1 if s in name else 0,
-            -len(path_str),
+            2 if in_apps[i] else 0,
+            2 if names[i].startswith(s) else 0,
+            1 if s in names[i] else 0,
+            -len(paths[i]),
         )
-    hits.sort(key=score, reverse=True)
-    return hits[0]
+    # max() keeps the first of equally scored hits, same as the stable reverse sort did
+    return Path(paths[max(range(len(paths)), key=score)])
+
+def _mac_bid_cache_path() -> Path:
+    return Path.home() / "Library" / "Caches" / "elgato_prompter_text_cli" / "bid.json"
 
 def mac_bundle_id_for(app_path: Path) -> str:
-    return run(["mdls", "-name", "kMDItemCFBundleIdentifier", "-raw", str(app_path)])
+    """
+    CFBundleIdentifier read straight from the bundle's Info.plist (no `mdls` subprocess),
+    memoized on disk keyed by app path and the plist's mtime.
+    """
+    info_plist = app_path / "Contents" / "Info.plist"
+    cache_path = _mac_bid_cache_path()
+    try:
+        mtime = info_plist.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+
+    cache = {}
+    if mtime is not None:
+        try:
+            cache = json.loads(cache_path.read_text(encoding="utf-8"))
+            hit = cache.get(str(app_path))
+            if hit and hit[0] == mtime:
+                return hit[1]
+        except (OSError, ValueError, AttributeError, IndexError, TypeError):
+            cache = {}
+
+    bid = None
+    try:
+        with info_plist.open("rb") as f:
+            bid = plistlib.load(f).get("CFBundleIdentifier")
+    except Exception:
+        pass
+    if not isinstance(bid, str) or not bid:
+        return run(["mdls", "-name", "kMDItemCFBundleIdentifier", "-raw", str(app_path)])
+
+    if mtime is not None:
+        cache[str(app_path)] = [mtime, bid]
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(cache), encoding="utf-8")
+            tmp.replace(cache_path)
+        except OSError:
+            pass
+    return bid
 
 def mac_count_running_procs(bundle_id: str) -> int:
     out = run([
@@ -68,115 +300,378 @@ def mac_count_running_procs(bundle_id: str) -> int:
     except (ValueError, TypeError):
         return 0
 
+_DIGITS = re.compile(rb"\d+")
+
+def osascript_ints(script: str) -> List[int]:
+    """Run an AppleScript and return every integer in its output (e.g. a "123, 456" pid list)."""
+    res = subprocess.run(["osascript", "-e", script], check=False, capture_output=True)
+    return list(map(int, _DIGITS.findall(res.stdout or b"")))
+
 def mac_pids_for(bundle_id: str) -> List[int]:
-    out = run([
-        "osascript", "-e",
+    return osascript_ints(
         f'tell application "System Events" to get the unix id of every process whose bundle identifier is "{bundle_id}"'
-    ], check=False)
-    if not out:
-        return []
-    return [int(x.strip()) for x in out.split(",") if x.strip().isdigit()]
+    )
+
+MAC_QUIT_SCRIPT = """
+tell application id "{bid}" to quit
+repeat {polls} times
+    tell application "System Events"
+        set n to count (every process whose bundle identifier is "{bid}")
+    end tell
+    if n = 0 then return ""
+    delay 0.3
+end repeat
+tell application "System Events"
+    set ids to unix id of every process whose bundle identifier is "{bid}"
+end tell
+set AppleScript's text item delimiters to ","
+return ids as text
+"""
 
 def mac_quit_app(bundle_id: str, timeout_s: float = 20.0, force_after_timeout: bool = True):
-    subprocess.run(["osascript", "-e", f'tell application id "{bundle_id}" to quit'], check=False)
-    deadline = time.time() + timeout_s
-    while time.time() < deadline:
-        if mac_count_running_procs(bundle_id) == 0:
-            return
-        time.sleep(0.3)
+    leftover = None
+    pids = mac_pids_for(bundle_id)
+    if pids:
+        # Wake on the NOTE_EXIT events rather than re-asking System Events every tick
+        subprocess.run(["osascript", "-e", f'tell application id "{bundle_id}" to quit'], check=False)
+        leftover = wait_pids_exit(pids, timeout_s)
+    if leftover is None:
+        # Quit, wait and collect leftover pids in a single osascript run instead of one per poll
+        script = MAC_QUIT_SCRIPT.format(bid=bundle_id, polls=max(1, int(timeout_s / 0.3)))
+        leftover = osascript_ints(script)
     if force_after_timeout:
-        for pid in mac_pids_for(bundle_id):
+        for pid in leftover:
             try:
                 os.kill(pid, 9)
             except ProcessLookupError:
                 pass
 
-def mac_launch_app(bundle_id: str):
+def mac_open_app_bundle(app_path: Path) -> bool:
+    """Launch an .app bundle in-process with LSOpenCFURLRef; False means use `open` instead."""
+    libs = _mac_frameworks()
+    if libs is None:
+        return False
+    cs, cf, _, _ = libs
+    raw = os.fsencode(str(app_path))
+    url = cf.CFURLCreateFromFileSystemRepresentation(None, raw, len(raw), True)
+    if not url:
+        return False
+    try:
+        return cs.LSOpenCFURLRef(url, None) == 0
+    finally:
+        cf.CFRelease(url)
+
+def mac_launch_app(bundle_id: str, app_path: Optional[Path] = None):
+    if app_path is not None and mac_open_app_bundle(app_path):
+        return
+    # open brings the app to the front on its own (no -g), so no separate activate call
     subprocess.run(["open", "-b", bundle_id], check=True)
-    subprocess.run(["osascript", "-e", f'tell application id "{bundle_id}" to activate'], check=False)
 
 # -------------------------
 # Windows implementation
 # -------------------------
 
+_PS_EXE: Optional[List[str]] = None
+
 def ps_exe() -> List[str]:
     """Prefer Windows PowerShell, fall back to PowerShell 7 if needed."""
+    global _PS_EXE
+    if _PS_EXE is not None:
+        return list(_PS_EXE)
+    # PATH lookup only; launching the binary just to probe it cost a full PowerShell startup
     for exe in ("powershell", "pwsh"):
-        try:
-            subprocess.run([exe, "-NoProfile", "-Command", "$PSVersionTable.PSVersion"], capture_output=True)
-            return [exe, "-NoProfile", "-Command"]
-        except FileNotFoundError:
-            continue
+        if shutil.which(exe):
+            _PS_EXE = [exe, "-NoProfile", "-Command"]
+            return list(_PS_EXE)
     raise RuntimeError("PowerShell not found in PATH.")
 
+def _ps_b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+class PowerShellSession:
+    """
+    One long-lived PowerShell reading commands from stdin, so a restart pays the
+    interpreter startup once instead of once per query.
+
+    Each script is sent as a single base64-wrapped line (so quoting and multi-line
+    bodies are safe) followed by a sentinel line that marks the end of its output.
+    """
+    def __init__(self):
+        exe = ps_exe()[0]
+        self._proc = subprocess.Popen(
+            [exe, "-NoProfile", "-NonInteractive", "-Command", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0,
+        )
+        self._lock = threading.Lock()
+        self._send("[Console]::OutputEncoding = [Text.Encoding]::UTF8")
+        # win_find_processes' CIM fallback opens $global:EptCimSession on first use; close() removes it if so
+        self._send("$global:EptCimSession = $null; $global:EptPersistent = $true")
+
+    def _send(self, line: str):
+        self._proc.stdin.write((line + "\n").encode("utf-8"))
+        self._proc.stdin.flush()
+
+    def run(self, script: str, arg: Optional[str] = None, check=True) -> str:
+        token = f"__EOT_{uuid.uuid4().hex}__"
+        sb = f"[ScriptBlock]::Create([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{_ps_b64(script)}')))"
+        call = f"& ({sb})"
+        if arg is not None:
+            call += f" ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{_ps_b64(arg)}')))"
+        with self._lock:
+            self._send(
+                f"$__ok = $true; try {{ {call} 2>$null | Out-String -Stream -Width 4096; $__ok = $? }} "
+                f"catch {{ $__ok = $false }}; '{token}' + [int]$__ok"
+            )
+            lines: List[str] = []
+            while True:
+                raw = self._proc.stdout.readline()
+                if not raw:
+                    raise RuntimeError("PowerShell session exited unexpectedly.")
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if line.startswith(token):
+                    ok = line[len(token):] == "1"
+                    break
+                lines.append(line)
+        out = "\n".join(lines).strip()
+        if check and not ok:
+            raise subprocess.CalledProcessError(1, "powershell", output=out)
+        return out
+
+    def close(self):
+        try:
+            self._send("if ($global:EptCimSession) { Remove-CimSession $global:EptCimSession }")
+            self._send("exit")
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+
+_PS: Optional[PowerShellSession] = None
+
+@contextlib.contextmanager
+def ps_session():
+    """Route ps_run through one persistent PowerShell for the duration of the block."""
+    global _PS
+    if _PS is not None:
+        yield _PS
+        return
+    try:
+        _PS = PowerShellSession()
+    except (OSError, RuntimeError):
+        yield None  # one-shot ps_run still works
+        return
+    try:
+        yield _PS
+    finally:
+        _PS.close()
+        _PS = None
+
 def ps_run(script: str, arg: Optional[str] = None, check=True) -> str:
     """Run a PowerShell script; pass one arg via $args[0] to avoid quoting issues."""
+    if _PS is not None:
+        return _PS.run(script, arg, check=check)
     cmd = ps_exe() + [script] + ([arg] if arg is not None else [])
     res = subprocess.run(cmd, check=check, capture_output=True, text=True)
     return (res.stdout or "").strip()
 
-def win_find_running_pids(search: str) -> List[int]:
-    script = r'''
-$search = $args[0]
-$like = "*" + $search + "*"
-(Get-CimInstance Win32_Process |
-  Where-Object { $_.Name -like $like -or $_.CommandLine -like $like } |
-  Select-Object -ExpandProperty ProcessId) -join "`n"
-'''
-    out = ps_run(script, search, check=False)
-    return [int(x) for x in out.splitlines() if x.strip().isdigit()]
+def win_find_processes(search: str) -> List[Tuple[int, Optional[str]]]:
+    """
+    Matching processes as (pid, executable path).
 
-def win_exec_path_for_pid(pid: int) -> Optional[str]:
+    Filters [Diagnostics.Process]::GetProcesses() by name in memory, which is far cheaper
+    than WMI; only when nothing matches by name do we fall back to one projected CIM query
+    that also matches the command line.
+    """
     script = r'''
-$pid = [int]$args[0]
-try {
-  (Get-CimInstance Win32_Process -Filter "ProcessId = $pid").ExecutablePath
-} catch { "" }
+$like = "*" + [WildcardPattern]::Escape($args[0]) + "*"
+$procs = @([Diagnostics.Process]::GetProcesses() | Where-Object { $_.ProcessName -like $like })
+if ($procs.Count -gt 0) {
+  $procs | ForEach-Object { try { "$($_.Id)`t$($_.MainModule.FileName)" } catch { "$($_.Id)`t" } }
+} else {
+  $s = $args[0] -replace '\\', '\\' -replace "'", "\'" -replace '([\[_%])', '[$1]'
+  $q = "SELECT ProcessId,ExecutablePath FROM Win32_Process WHERE Name LIKE '%$s%' OR CommandLine LIKE '%$s%'"
+  # In the persistent session, open one local CimSession (DCOM: no WinRM needed) on first use and reuse it
+  if ($global:EptPersistent -and -not $global:EptCimSession) {
+    try {
+      $global:EptCimSession = New-CimSession -ComputerName localhost `
+        -SessionOption (New-CimSessionOption -Protocol Dcom) -ErrorAction Stop
+    } catch {}
+  }
+  $cim = @{}
+  if ($global:EptCimSession) { $cim['CimSession'] = $global:EptCimSession }
+  Get-CimInstance @cim -Query $q | ForEach-Object { "$($_.ProcessId)`t$($_.ExecutablePath)" }
+}
 '''
-    out = ps_run(script, str(pid), check=False).strip()
-    return out if out else None
-
-def win_quit_pids(pids: List[int], timeout_s: float = 20.0, force_after_timeout: bool = True):
-    """Try CloseMainWindow first, then Stop-Process -Force if still alive after timeout."""
-    if not pids:
-        return
-    # Ask nicely
-    script_close = r'''
-param([int[]]$pids)
-$pids | ForEach-Object {
+    out = ps_run(script, search, check=False)
+    procs: List[Tuple[int, Optional[str]]] = []
+    for line in out.splitlines():
+        pid, _, path = line.partition("\t")
+        if pid.strip().isdigit():
+            procs.append((int(pid), path.strip() or None))
+    return procs
+
+WIN_CLOSE_AND_WAIT_SCRIPT = r'''
+$ids = @(($args[0] -split ',') | Where-Object { $_ -match '^\d+$' } | ForEach-Object { [int]$_ })
+$deadline = [DateTime]::UtcNow.AddMilliseconds(__TIMEOUT_MS__)
+$procs = @()
+foreach ($id in $ids) {
   try {
-    $p = Get-Process -Id $_ -ErrorAction Stop
+    $p = Get-Process -Id $id -ErrorAction Stop
     # CloseMainWindow() returns $true when a WM_CLOSE was sent
     $null = $p.CloseMainWindow()
+    $procs += $p
   } catch {}
 }
+$alive = @()
+foreach ($p in $procs) {
+  $left = [int][Math]::Max(0, ($deadline - [DateTime]::UtcNow).TotalMilliseconds)
+  if (-not $p.WaitForExit($left)) { $alive += $p.Id }
+}
+$alive -join "`n"
 '''
-    # Feed pids as a PowerShell array string
-    ps_run(script_close, ",".join(map(str, pids)), check=False)
-
-    deadline = time.time() + timeout_s
-    while time.time() < deadline:
-        alive = [pid for pid in pids if win_is_pid_alive(pid)]
-        if not alive:
-            return
-        time.sleep(0.3)
 
-    if force_after_timeout:
-        script_kill = r'''
-param([int[]]$pids)
-$pids | ForEach-Object {
-  try { Stop-Process -Id $_ -Force -ErrorAction SilentlyContinue } catch {}
+WIN_KILL_SCRIPT = r'''
+($args[0] -split ',') | Where-Object { $_ -match '^\d+$' } | ForEach-Object {
+  try { Stop-Process -Id ([int]$_) -Force -ErrorAction SilentlyContinue } catch {}
 }
 '''
-        ps_run(script_kill, ",".join(map(str, pids)), check=False)
+
+_WM_CLOSE = 0x0010
+
+def win_post_close(pids: List[int]) -> bool:
+    """
+    Post WM_CLOSE to every visible top-level window owned by pids (user32 EnumWindows).
+    Unlike Process.CloseMainWindow this reaches all of an app's windows, and needs no PowerShell.
+    Returns False when user32 isn't available.
+    """
+    if not is_windows():
+        return False
+    from ctypes import wintypes
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    user32.EnumWindows.argtypes = [enum_proc, wintypes.LPARAM]
+    user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    user32.IsWindowVisible.argtypes = [wintypes.HWND]
+    user32.PostMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+
+    wanted = set(pids)
+    def on_window(hwnd, _lparam):
+        owner = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(owner))
+        if owner.value in wanted and user32.IsWindowVisible(hwnd):
+            user32.PostMessageW(hwnd, _WM_CLOSE, 0, 0)
+        return True
+    user32.EnumWindows(enum_proc(on_window), 0)
+    return True
+
+def win_quit_pids(pids: List[int], timeout_s: float = 20.0, force_after_timeout: bool = True):
+    """Try WM_CLOSE/CloseMainWindow first, then Stop-Process -Force if still alive after timeout."""
+    if not pids:
+        return
+    # Ask nicely in-process (WM_CLOSE) and wait on the process handles
+    alive = None
+    if win_post_close(pids):
+        alive = wait_pids_exit(pids, timeout_s)
+    if alive is None:
+        # Same thing via CloseMainWindow/WaitForExit inside one PowerShell call; it prints the survivors
+        script = WIN_CLOSE_AND_WAIT_SCRIPT.replace("__TIMEOUT_MS__", str(int(timeout_s * 1000)))
+        out = ps_run(script, ",".join(map(str, pids)), check=False)
+        alive = [int(x) for x in out.splitlines() if x.strip().isdigit()]
+    # Re-check just before killing; some may have exited since the wait ended
+    alive = [pid for pid in alive if win_is_pid_alive(pid)]
+    if alive and force_after_timeout:
+        ps_run(WIN_KILL_SCRIPT, ",".join(map(str, alive)), check=False)
+
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+_STILL_ACTIVE = 259
 
 def win_is_pid_alive(pid: int) -> bool:
-    script = r'''
-$pid = [int]$args[0]
-try { $null = Get-Process -Id $pid -ErrorAction Stop; "1" } catch { "0" }
+    """
+    In-process liveness probe: OpenProcess + GetExitCodeProcess, no PowerShell.
+    (os.kill(pid, 0) is not an option here: on Windows it calls TerminateProcess.)
+    """
+    from ctypes import wintypes
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.OpenProcess.restype = wintypes.HANDLE
+    k32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    k32.GetExitCodeProcess.argtypes = [wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD)]
+    k32.CloseHandle.argtypes = [wintypes.HANDLE]
+    h = k32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not h:
+        # Access denied means it exists but belongs to someone else
+        return ctypes.get_last_error() == _ERROR_ACCESS_DENIED
+    try:
+        code = wintypes.DWORD()
+        if not k32.GetExitCodeProcess(h, ctypes.byref(code)):
+            return True
+        return code.value == _STILL_ACTIVE
+    finally:
+        k32.CloseHandle(h)
+
+LNK_INDEX_SCRIPT = r'''
+$roots = @("$env:ProgramData\Microsoft\Windows\Start Menu\Programs",
+           "$env:AppData\Microsoft\Windows\Start Menu\Programs")
+$wsh = New-Object -ComObject WScript.Shell
+Get-ChildItem $roots -Recurse -Filter *.lnk -ErrorAction SilentlyContinue |
+  Sort-Object FullName |
+  ForEach-Object { "$($_.BaseName)`t$($wsh.CreateShortcut($_.FullName).TargetPath)" }
 '''
-    out = ps_run(script, str(pid), check=False)
-    return out.strip() == "1"
+
+def _win_start_menu_roots() -> List[Path]:
+    roots = []
+    for env in ("ProgramData", "AppData"):
+        base = os.environ.get(env)
+        if base:
+            roots.append(Path(base) / "Microsoft" / "Windows" / "Start Menu" / "Programs")
+    return roots
+
+def _win_lnk_cache_path() -> Path:
+    base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+    return Path(base) / "elgato_prompter_text_cli" / "lnk_index.json"
+
+def _tree_mtime_stamp(roots: List[Path]) -> List[int]:
+    # Adding or removing a shortcut bumps the mtime of the folder holding it, so the newest
+    # folder mtime under each root tells us whether the index is stale
+    stamp = []
+    for root in roots:
+        newest = 0
+        for dirpath, _, _ in os.walk(root):
+            try:
+                newest = max(newest, os.stat(dirpath).st_mtime_ns)
+            except OSError:
+                continue
+        stamp.append(newest)
+    return stamp
+
+def win_lnk_index() -> List[Tuple[str, str]]:
+    """
+    (shortcut BaseName, target path) for every Start Menu .lnk, ordered by shortcut path.
+
+    Cached in %LOCALAPPDATA%\\elgato_prompter_text_cli\\lnk_index.json and rebuilt with one
+    PowerShell call only when a Start Menu folder has changed since the cache was written.
+    """
+    stamp = _tree_mtime_stamp(_win_start_menu_roots())
+    cache_path = _win_lnk_cache_path()
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached["stamp"] == stamp:
+            return [(b, t) for b, t in cached["entries"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    entries: List[Tuple[str, str]] = []
+    for line in ps_run(LNK_INDEX_SCRIPT, check=False).splitlines():
+        base_name, sep, target = line.partition("\t")
+        if sep and target.strip():
+            entries.append((base_name, target.strip()))
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"stamp": stamp, "entries": entries}), encoding="utf-8")
+        tmp.replace(cache_path)
+    except OSError:
+        pass
+    return entries
 
 def win_resolve_launch_target(search: str, fallback_from_pid: Optional[str]) -> tuple[str, str]:
     """
@@ -192,24 +687,10 @@ def win_resolve_launch_target(search: str, fallback_from_pid: Optional[str]) ->
         return ("exe", fallback_from_pid)
 
     # 2) Start Menu .lnk
-    script_lnk = r'''
-$search = $args[0]
-$like = "*" + $search + "*"
-$roots = @("$env:ProgramData\Microsoft\Windows\Start Menu\Programs",
-           "$env:AppData\Microsoft\Windows\Start Menu\Programs")
-$lnk = Get-ChildItem $roots -Recurse -Filter *.lnk -ErrorAction SilentlyContinue |
-         Where-Object { $_.BaseName -like $like } |
-         Sort-Object FullName |
-         Select-Object -First 1 -ExpandProperty FullName
-if ($lnk) {
-  $wsh = New-Object -ComObject WScript.Shell
-  $target = $wsh.CreateShortcut($lnk).TargetPath
-  $target
-}
-'''
-    lnk_target = ps_run(script_lnk, search, check=False).strip()
-    if lnk_target:
-        return ("exe", lnk_target)
+    like = f"*{search.lower()}*"
+    for base_name, target in win_lnk_index():
+        if fnmatch.fnmatchcase(base_name.lower(), like):
+            return ("exe", target)
 
     # 3) UWP / Appx
     script_uwp = r'''
@@ -227,7 +708,20 @@ try {
     # 4) Alias / PATH program name
     return ("alias", search)
 
+def win_shell_execute(target: str) -> bool:
+    """Open a file/app/shell: URI in-process via ShellExecuteW; False means use Start-Process instead."""
+    if not is_windows():
+        return False
+    shell32 = ctypes.windll.shell32
+    shell32.ShellExecuteW.restype = ctypes.c_void_p
+    shell32.ShellExecuteW.argtypes = [ctypes.c_void_p, ctypes.c_wchar_p, ctypes.c_wchar_p,
+                                      ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_int]
+    # Return values above 32 mean success; SW_SHOWNORMAL = 1
+    return (shell32.ShellExecuteW(None, "open", target, None, None, 1) or 0) > 32
+
 def win_launch(mode: str, value: str):
+    if win_shell_execute("shell:AppsFolder\\" + value if mode == "uwp" else value):
+        return
     if mode == "exe":
         # Explicit .exe path
         script = r'''
@@ -270,35 +764,38 @@ def restart_app(search: str):
         else:
             print("App not running; will launch fresh.")
         print("Launching…")
-        mac_launch_app(bid)
+        mac_launch_app(bid, app_path)
         print("Done.")
         return
 
     if is_windows():
-        print(f"[Windows] Searching for running processes matching: {search!r}")
-        pids = win_find_running_pids(search)
-        exe_from_running = None
-        if pids:
+        with ps_session():
+            print(f"[Windows] Searching for running processes matching: {search!r}")
+            procs = win_find_processes(search)
+            pids = [pid for pid, _ in procs]
             # Prefer to relaunch the same executable we just closed
-            for pid in pids:
-                path = win_exec_path_for_pid(pid)
-                if path:
-                    exe_from_running = path
-                    break
-            print(f"Found {len(pids)} running instance(s); attempting graceful close…")
-            win_quit_pids(pids)
-        else:
-            print("No running instance found; will launch fresh.")
+            exe_from_running = next((path for _, path in procs if path), None)
+            if pids:
+                print(f"Found {len(pids)} running instance(s); attempting graceful close…")
+                win_quit_pids(pids)
+            else:
+                print("No running instance found; will launch fresh.")
 
-        mode, target = win_resolve_launch_target(search, exe_from_running)
-        print(f"Launching ({mode}): {target}")
-        win_launch(mode, target)
-        print("Done.")
-        return
+            mode, target = win_resolve_launch_target(search, exe_from_running)
+            print(f"Launching ({mode}): {target}")
+            win_launch(mode, target)
+            print("Done.")
+            return
 
     raise SystemExit(f"Unsupported platform: {sys.platform}")
 
 
+class LaunchInfo(NamedTuple):
+    """What __exit__ needs to relaunch: mac (bundle id, app path) or win (mode, target)."""
+    platform: str
+    bid_or_mode: str
+    target: Optional[Union[str, Path]] = None
+
 class AppRestarter:
     """
     Context manager that stops an app on enter and restarts it on exit.
@@ -312,6 +809,9 @@ class AppRestarter:
             pass
         # App is relaunched here (if it was running before)
     """
+    __slots__ = ("search", "timeout_s", "force_after_timeout", "restart_if_not_running",
+                 "_platform", "_should_restart", "_launch_info")
+
     def __init__(self, search: str, *, timeout_s: float = 20.0,
                  force_after_timeout: bool = True, restart_if_not_running: bool = False):
         self.search = search
@@ -322,7 +822,7 @@ class AppRestarter:
         # Internal state
         self._platform = "mac" if sys.platform == "darwin" else ("win" if sys.platform.startswith("win") else "other")
         self._should_restart = False
-        self._launch_info = None  # mac: ("mac", bundle_id) ; win: ("win", mode, target)
+        self._launch_info: Optional[LaunchInfo] = None
 
     def __enter__(self):
         if self._platform == "mac":
@@ -332,7 +832,7 @@ class AppRestarter:
             bid = mac_bundle_id_for(app_path)
             if not bid or bid == "(null)":
                 raise RuntimeError(f"[macOS] Could not determine bundle id for: {app_path}")
-            self._launch_info = ("mac", bid)
+            self._launch_info = LaunchInfo("mac", bid, app_path)
 
             was_running = mac_count_running_procs(bid) > 0
             if was_running:
@@ -343,22 +843,19 @@ class AppRestarter:
             return self
 
         if self._platform == "win":
-            pids = win_find_running_pids(self.search)
-            exe_from_running = None
-            if pids:
-                for pid in pids:
-                    path = win_exec_path_for_pid(pid)
-                    if path:
-                        exe_from_running = path
-                        break
-                win_quit_pids(pids, timeout_s=self.timeout_s, force_after_timeout=self.force_after_timeout)
-                self._should_restart = True
-            else:
-                self._should_restart = self.restart_if_not_running
-
-            mode, target = win_resolve_launch_target(self.search, exe_from_running)
-            self._launch_info = ("win", mode, target)
-            return self
+            with ps_session():
+                procs = win_find_processes(self.search)
+                pids = [pid for pid, _ in procs]
+                exe_from_running = next((path for _, path in procs if path), None)
+                if pids:
+                    win_quit_pids(pids, timeout_s=self.timeout_s, force_after_timeout=self.force_after_timeout)
+                    self._should_restart = True
+                else:
+                    self._should_restart = self.restart_if_not_running
+
+                mode, target = win_resolve_launch_target(self.search, exe_from_running)
+                self._launch_info = LaunchInfo("win", mode, target)
+                return self
 
         raise RuntimeError(f"Unsupported platform: {sys.platform}")
 
@@ -367,13 +864,11 @@ class AppRestarter:
             if not self._should_restart or not self._launch_info:
                 return False  # don't suppress exceptions
 
-            if self._platform == "mac":
-                _, bid = self._launch_info
-                mac_launch_app(bid)
-
-            elif self._platform == "win":
-                _, mode, target = self._launch_info
-                win_launch(mode, target)
+            info = self._launch_info
+            if info.platform == "mac":
+                mac_launch_app(info.bid_or_mode, info.target)
+            else:
+                win_launch(info.bid_or_mode, info.target)
 
         finally:
             # Propagate any exception from the with-block